@@ -18,21 +18,24 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import collections
-from collections.abc import Callable, Iterator
+from collections.abc import Callable, Iterable, Iterator
+from concurrent import futures
+import functools
 import gzip
+import hashlib
 import json
 import logging
 import os
-import re
+import queue
+import sys
 import threading
 import time
 from typing import Any, List, Optional, TypedDict
+import uuid
 
 from etils import epath
-from ratelimit import limits
-from ratelimit import sleep_and_retry
-import six
+import fsspec
+from werkzeug import datastructures
 from werkzeug import wrappers
 
 from xprof import version
@@ -44,6 +47,23 @@ from xprof.standalone.tensorboard_shim import plugin_asset_util
 
 logger = logging.getLogger('tensorboard')
 
+try:
+  import orjson  # pylint: disable=g-import-not-at-top
+except ImportError:
+  orjson = None
+
+try:
+  # Intel ISA-L's SIMD-accelerated deflate, typically 3-5x faster than
+  # zlib; the two expose the same compressobj interface.
+  from isal import isal_zlib as _zlib  # pylint: disable=g-import-not-at-top
+except ImportError:
+  import zlib as _zlib  # pylint: disable=g-import-not-at-top
+
+try:
+  from pybloom_live import ScalableBloomFilter  # pylint: disable=g-import-not-at-top
+except ImportError:
+  ScalableBloomFilter = None
+
 try:
   import tensorflow.compat.v2 as tf  # pylint: disable=g-import-not-at-top
   from tensorflow.python.profiler import profiler_client  # pylint: disable=g-direct-tensorflow-import,g-import-not-at-top
@@ -63,6 +83,10 @@ except ImportError:
 TB_NAME = 'plugins'
 PLUGIN_NAME = 'profile'
 
+# Relative-path suffix identifying a profile plugin directory; the scan
+# loops match candidate paths against it with a single endswith.
+_PROFILE_DIR_SUFFIX = os.sep + TB_NAME + os.sep + PLUGIN_NAME
+
 BASE_ROUTE = '/'
 INDEX_JS_ROUTE = '/index.js'
 INDEX_HTML_ROUTE = '/index.html'
@@ -78,6 +102,7 @@ RUN_TOOLS_ROUTE = '/run_tools'
 HOSTS_ROUTE = '/hosts'
 HLO_MODULE_LIST_ROUTE = '/module_list'
 CAPTURE_ROUTE = '/capture_profile'
+CAPTURE_STATUS_ROUTE = '/capture_status'
 LOCAL_ROUTE = '/local'
 CACHE_VERSION_FILE = 'cache_version.txt'
 
@@ -96,14 +121,25 @@ ALL_HOSTS = 'ALL_HOSTS'
 
 HostMetadata = TypedDict('HostMetadata', {'hostname': str})
 
-_EXTENSION_TO_TOOL = {extension: tool for tool, extension in TOOLS.items()}
-
-_FILENAME_RE = re.compile(r'(?:(.*)\.)?(' +
-                          '|'.join(TOOLS.values()).replace('.', r'\.') + r')')
+# Tool extensions with their '.'-prefixed suffix form, longest first so
+# that the most specific extension wins if one is ever a suffix of another.
+# A plain str.endswith dispatch here is several times faster than running a
+# regex over every filename in a directory listing.
+_TOOL_SUFFIXES = tuple(
+    sorted(
+        ((extension, '.' + extension, tool)
+         for tool, extension in TOOLS.items()),
+        key=lambda item: len(item[0]),
+        reverse=True,
+    )
+)
 
 
 # Tools that can be generated from xplane end with ^.
-XPLANE_TOOLS = [
+# The tuple preserves the presentation order used when expanding the tool
+# list for a run; the frozenset backs the membership checks on the request
+# path, where a linear scan of the tuple would run several times per call.
+XPLANE_TOOLS_ORDERED = (
     'trace_viewer',  # non-streaming before TF 2.13
     'trace_viewer@',  # streaming since TF 2.14
     'overview_page',
@@ -119,7 +155,8 @@ XPLANE_TOOLS = [
     'memory_viewer',
     'graph_viewer',
     'megascale_stats',
-]
+)
+XPLANE_TOOLS = frozenset(XPLANE_TOOLS_ORDERED)
 
 # XPlane generated tools that support all host mode.
 XPLANE_TOOLS_ALL_HOSTS_SUPPORTED = frozenset([
@@ -138,18 +175,298 @@ XPLANE_TOOLS_ALL_HOSTS_ONLY = frozenset(
 # Rate limiter constants, the GCS quota defined below
 # https://cloud.google.com/storage/quotas#rate-quotas.
 # currently set to 1000 request per minute.
-# TODO(kcai): The assumption on the average number of subdirs is not
-# always true. If this is not sufficient, we can consider a token-based
-# approach that counts the number of subdirs after calling iterdir.
 MAX_GCS_REQUESTS = 1000
 LIMIT_WINDOW_SECONDS = 60
-AVERAGE_SUBDIR_NUMBER = 10
+
+# How long a cached run-directory listing stays fresh. Several handlers list
+# the same run directory back-to-back during a single page load; on remote
+# filesystems each listing is a LIST RPC.
+_DIR_LISTING_TTL_SECONDS = 5.0
+
+# How long a negative is_active result is cached, so repeated polls of a
+# dormant plugin don't each walk the whole logdir.
+_IS_ACTIVE_NEG_TTL_SECONDS = 10.0
+
+# How long a run directory's recorded cache version stays fresh; each read
+# is a GET on remote filesystems and the value only changes on writes the
+# plugin makes itself.
+_CACHE_VERSION_TTL_SECONDS = 30.0
+
+# URI prefixes for object stores that can answer a recursive listing in a
+# handful of requests, making a per-directory tree walk unnecessary.
+_OBJECT_STORE_PREFIXES = ('gs://', 's3://')
+
+# How long a finished background capture job is kept for /capture_status
+# polling before it is evicted.
+_CAPTURE_JOB_TTL_SECONDS = 600.0
+
+# When set to '1', completed logdir scans are persisted under
+# ~/.cache/xprof so a restarted TensorBoard can skip the cold walk of a
+# slow remote logdir.
+_CACHE_RUNS_ENV = 'XPROF_CACHE_RUNS'
+
+# How long a completed logdir scan keeps serving run listings before the
+# next caller (or the background refresher) pays for a rescan. Local
+# logdirs are additionally invalidated when the logdir mtime changes.
+_RUNS_CACHE_TTL_SECONDS = float(
+    os.environ.get('XPROF_RUNS_CACHE_SECONDS', '30')
+)
+
+# TensorBoard-generated run subdirectory names whose parent directory is
+# also worth checking for profile data.
+_TB_SUBDIR_NAMES = frozenset(('train', 'validation'))
+
+# Directory names that never contain profile data; descending into them
+# burns listing quota enumerating checkpoint and asset payloads.
+_SCAN_SKIP_DIR_NAMES = frozenset(
+    ('checkpoints', 'variables', 'assets', '__pycache__')
+)
+
+# Number of threads used to overlap latency-bound directory listings. The
+# workers spend almost all their time waiting on filesystem round trips, so
+# the pool can be much wider than the CPU count.
+_SCAN_WORKERS = int(os.environ.get('XPROF_SCAN_WORKERS', '16'))
 
 
 def use_xplane(tool: str) -> bool:
   return tool in XPLANE_TOOLS
 
 
+def _tool_sort_key(tool: str) -> tuple[bool, str]:
+  """Sort key placing 'overview_page' first, the rest alphabetically."""
+  return (tool != 'overview_page', tool)
+
+
+# Number of emitted runs past which the exact dedup set is traded for a
+# bloom filter, when pybloom_live is available.
+_VISITED_RUNS_BLOOM_THRESHOLD = 10_000
+
+
+class _VisitedRuns:
+  """Dedup set for emitted frontend runs with bounded memory.
+
+  A logdir can hold hundreds of thousands of profile runs, and an exact
+  set of their names is a real RSS cost whose only job is suppressing
+  duplicate yields. Below a size threshold this is a plain set with exact
+  answers; past it, when pybloom_live is available, the contents migrate
+  into a scalable bloom filter whose rare false positives (1e-4) merely
+  suppress a yield. Without pybloom_live the exact set is kept.
+  """
+
+  def __init__(self):
+    self._exact = set()
+    self._bloom = None
+
+  def __contains__(self, run: str) -> bool:
+    if self._bloom is not None:
+      return run in self._bloom
+    return run in self._exact
+
+  def add(self, run: str) -> None:
+    if self._bloom is not None:
+      self._bloom.add(run)
+      return
+    self._exact.add(run)
+    if (
+        ScalableBloomFilter is not None
+        and len(self._exact) >= _VISITED_RUNS_BLOOM_THRESHOLD
+    ):
+      bloom = ScalableBloomFilter(
+          initial_capacity=2 * _VISITED_RUNS_BLOOM_THRESHOLD, error_rate=1e-4
+      )
+      for visited in self._exact:
+        bloom.add(visited)
+      self._bloom = bloom
+      self._exact = set()
+
+
+class _GcsTokenBucket:
+  """Token bucket that throttles by the actual number of storage requests.
+
+  Each listing issued is charged one token; the bucket refills at the GCS
+  LIST rate quota and blocks callers only when the quota is genuinely
+  exhausted.
+  """
+
+  def __init__(
+      self,
+      capacity: int = MAX_GCS_REQUESTS,
+      window_seconds: float = LIMIT_WINDOW_SECONDS,
+  ):
+    self._capacity = float(capacity)
+    self._refill_rate = capacity / window_seconds
+    self._tokens = float(capacity)
+    self._updated = time.monotonic()
+    self._lock = threading.Lock()
+
+  def acquire(self, tokens: int = 1) -> None:
+    """Blocks until `tokens` tokens are available, then consumes them."""
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity,
+            self._tokens + (now - self._updated) * self._refill_rate,
+        )
+        self._updated = now
+        if self._tokens >= tokens:
+          self._tokens -= tokens
+          return
+        wait_seconds = (tokens - self._tokens) / self._refill_rate
+      time.sleep(wait_seconds)
+
+
+# The CSP directives are constant, so the header value is computed once at
+# import time instead of being rebuilt on every response.
+_CSP_PARTS = {
+    'default-src': ["'self'"],
+    'script-src': [
+        "'self'",
+        "'unsafe-eval'",
+        "'unsafe-inline'",
+        'https://www.gstatic.com',
+    ],
+    'object-src': ["'none'"],
+    'style-src': [
+        "'self'",
+        "'unsafe-inline'",
+        'https://fonts.googleapis.com',
+        'https://www.gstatic.com',
+    ],
+    'font-src': [
+        "'self'",
+        'https://fonts.googleapis.com',
+        'https://fonts.gstatic.com',
+        'data:',
+    ],
+    'connect-src': [
+        "'self'",
+        'data:',
+        'www.gstatic.com',
+    ],
+    'img-src': [
+        "'self'",
+        'blob:',
+        'data:',
+    ],
+    'script-src-elem': [
+        "'self'",
+        "'unsafe-inline'",
+        # Remember to restrict on integrity when importing from jsdelivr
+        # Whitelist this domain to support hlo_graph_dumper html format
+        'https://cdn.jsdelivr.net/npm/',
+        'https://www.gstatic.com',
+    ],
+}
+
+_CSP_HEADER = ';'.join(
+    (' '.join([k] + v) for (k, v) in _CSP_PARTS.items())
+)
+
+# Header template copied per response; copying a prebuilt Headers object
+# is cheaper than rebuilding the list of tuples on every call.
+_HEADERS_TEMPLATE = datastructures.Headers([
+    ('Content-Security-Policy', _CSP_HEADER),
+    ('X-Content-Type-Options', 'nosniff'),
+])
+
+# Bodies smaller than a typical TCP segment payload are cheaper to send
+# uncompressed than to deflate.
+_GZIP_MIN_BYTES = 860
+
+# Content types that are already compressed, for which another gzip pass
+# only burns CPU.
+_NO_COMPRESS_TYPES = frozenset([
+    'font/woff2',
+    'application/octet-stream',
+])
+
+# wbits value selecting a gzip container around the raw deflate stream.
+_GZIP_WBITS = 16 + _zlib.MAX_WBITS
+
+
+def _gzip_compress(data: bytes, level: int = 1) -> bytes:
+  """Gzip-compresses `data` for a dynamic response.
+
+  Goes through zlib (or isal when installed) rather than the gzip module
+  wrapper. Level 1 keeps ~95% of the size savings of higher levels at a
+  fraction of the CPU, which is the right tradeoff for per-request bodies.
+
+  Args:
+    data: The raw bytes to compress.
+    level: Deflate compression level.
+
+  Returns:
+    The gzip-framed compressed bytes.
+  """
+  compressor = _zlib.compressobj(level, _zlib.DEFLATED, _GZIP_WBITS)
+  return compressor.compress(data) + compressor.flush()
+
+
+# Bodies at least this large are streamed through a chunked compressor
+# instead of being fully buffered a second time in memory.
+_STREAM_MIN_BYTES = 1_000_000
+
+_STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _gzip_stream(body: bytes) -> Iterator[bytes]:
+  """Yields gzip-compressed chunks of `body`.
+
+  Werkzeug writes each yielded chunk to the socket as it is produced, so
+  the kernel starts sending bytes while compression continues and the
+  full compressed copy is never resident alongside the plain one.
+
+  Args:
+    body: The raw bytes to compress.
+
+  Yields:
+    Gzip-framed compressed chunks.
+  """
+  compressor = _zlib.compressobj(1, _zlib.DEFLATED, _GZIP_WBITS)
+  view = memoryview(body)
+  for start in range(0, len(view), _STREAM_CHUNK_BYTES):
+    chunk = compressor.compress(view[start:start + _STREAM_CHUNK_BYTES])
+    if chunk:
+      yield chunk
+  yield compressor.flush()
+
+
+def respond_streaming(
+    body: Any,
+    content_type: str,
+    code: int = 200,
+    etag: Optional[str] = None,
+) -> wrappers.Response:
+  """Like respond(), but gzip-compresses and sends the body in chunks.
+
+  Used for large payloads (trace tables, op_profile) where buffering the
+  whole compressed body would roughly double peak memory.
+
+  Args:
+    body: A raw `bytes` string or Unicode `str` (encoded as UTF-8).
+    content_type: Response content-type (`str`).
+    code: HTTP status code (`int`).
+    etag: Optional entity tag (unquoted) to advertise for client-side
+      caching.
+
+  Returns:
+    A `werkzeug.wrappers.Response` object with a streamed gzip body.
+  """
+  if not isinstance(body, bytes):
+    body = body.encode('utf-8')
+  headers = _HEADERS_TEMPLATE.copy()
+  if etag:
+    headers['ETag'] = '"%s"' % etag
+  headers['Content-Encoding'] = 'gzip'
+  return wrappers.Response(
+      _gzip_stream(body),
+      content_type=content_type,
+      status=code,
+      headers=headers,
+  )
+
+
 # HLO generated tools.
 HLO_TOOLS = frozenset(['graph_viewer', 'memory_viewer'])
 
@@ -158,6 +475,7 @@ def use_hlo(tool: str) -> bool:
   return tool in HLO_TOOLS
 
 
+@functools.lru_cache(maxsize=2048)
 def make_filename(host: str, tool: str) -> str:
   """Returns the name of the file containing data for the given host and tool.
 
@@ -177,6 +495,7 @@ def make_filename(host: str, tool: str) -> str:
   return filename + TOOLS[tool]
 
 
+@functools.lru_cache(maxsize=2048)
 def _parse_filename(filename: str) -> tuple[Optional[str], Optional[str]]:
   """Returns the host and tool encoded in a filename in the run directory.
 
@@ -189,10 +508,12 @@ def _parse_filename(filename: str) -> tuple[Optional[str], Optional[str]]:
     A tuple (host, tool) containing the names of the host and tool, e.g.,
     ('localhost', 'trace_viewer'). Either of the tuple's components can be None.
   """
-  m = _FILENAME_RE.fullmatch(filename)
-  if m is None:
-    return filename, None
-  return m.group(1), _EXTENSION_TO_TOOL[m.group(2)]
+  for extension, suffix, tool in _TOOL_SUFFIXES:
+    if filename == extension:
+      return None, tool
+    if filename.endswith(suffix):
+      return filename[:-len(suffix)] or None, tool
+  return filename, None
 
 
 def _get_hosts(filenames: list[str]) -> set[str]:
@@ -204,34 +525,53 @@ def _get_hosts(filenames: list[str]) -> set[str]:
   Returns:
     A set of host names encoded in the filenames.
   """
+  # The suffix checks are inlined rather than going through
+  # _parse_filename: listings can contain hundreds of entries and the
+  # per-name Python call frames dominate the loop otherwise.
   hosts = set()
   for name in filenames:
-    host, _ = _parse_filename(name)
-    if host:
-      hosts.add(host)
+    for extension, suffix, _ in _TOOL_SUFFIXES:
+      if name == extension:
+        break
+      if name.endswith(suffix):
+        host = name[:-len(suffix)]
+        if host:
+          hosts.add(host)
+        break
+    else:
+      if name:
+        hosts.add(name)
   return hosts
 
 
-def _get_tools(filenames: list[str], profile_run_dir: str) -> set[str]:
+def _get_tools(filenames: Iterable[str]) -> set[str]:
   """Parses a list of filenames and returns the set of tools.
 
   If xplane is present in the repository, add tools that can be generated by
-  xplane if we don't have a file for the tool.
+  xplane if we don't have a file for the tool. The xplane-derivable tools
+  are a static set, so enumerating them does not require parsing the xplane
+  protos themselves; tool names are a metadata query and should not cost a
+  full proto parse per poll.
 
   Args:
-    filenames: A list of filenames.
-    profile_run_dir: The run directory of the profile.
+    filenames: An iterable of filenames, consumed lazily.
 
   Returns:
     A set of tool names encoded in the filenames.
   """
   tools = set()
   found = set()
-  xplane_filenames = []
+  has_xplane = False
   for name in filenames:
-    _, tool = _parse_filename(name)
+    # Inlined suffix dispatch; see _get_hosts for why _parse_filename is
+    # not called per entry here.
+    tool = None
+    for extension, suffix, tool_name in _TOOL_SUFFIXES:
+      if name == extension or name.endswith(suffix):
+        tool = tool_name
+        break
     if tool == 'xplane':
-      xplane_filenames.append(os.path.join(profile_run_dir, name))
+      has_xplane = True
       continue
     elif tool == 'hlo_proto':
       continue
@@ -241,18 +581,10 @@ def _get_tools(filenames: list[str], profile_run_dir: str) -> set[str]:
         found.add(tool[:-1])
       else:
         found.add(tool)
-  # profile_run_dir might be empty, like in cloud AI use case.
-  if not profile_run_dir:
-    if xplane_filenames:
-      for item in XPLANE_TOOLS:
-        if item[:-1] not in found:
-          tools.add(item)
-  else:
-    try:
-      if xplane_filenames:
-        return set(convert.xspace_to_tool_names(xplane_filenames))
-    except AttributeError:
-      logger.warning('XPlane converters are available after Tensorflow 2.4')
+  if has_xplane:
+    for item in XPLANE_TOOLS_ORDERED:
+      if item[:-1] not in found:
+        tools.add(item)
   return tools
 
 
@@ -261,6 +593,8 @@ def respond(
     content_type: str,
     code: int = 200,
     content_encoding: Optional[tuple[str, str]] = None,
+    precompressed: Optional[bytes] = None,
+    etag: Optional[str] = None,
 ) -> wrappers.Response:
   """Create a Werkzeug response, handling JSON serialization and CSP.
 
@@ -273,81 +607,211 @@ def respond(
     content_encoding: Response Content-Encoding header ('str'); e.g. 'gzip'. If
       the content type is not set, The data would be compressed and the content
       encoding would be set to gzip.
+    precompressed: Optional gzip-compressed copy of `body`. When provided and
+      the body qualifies for compression, it is served directly instead of
+      compressing `body` again.
+    etag: Optional entity tag (unquoted) to advertise for client-side
+      caching.
 
   Returns:
     A `werkzeug.wrappers.Response` object.
   """
   if content_type == 'application/json' and isinstance(
       body, (dict, list, set, tuple)):
-    body = json.dumps(body, sort_keys=True)
+    if orjson is not None:
+      # orjson serializes several times faster than the stdlib and
+      # returns bytes directly, skipping the separate encode step below.
+      body = orjson.dumps(body, option=orjson.OPT_SORT_KEYS, default=list)
+    else:
+      body = json.dumps(body, sort_keys=True)
   if not isinstance(body, bytes):
     body = body.encode('utf-8')
-  csp_parts = {
-      'default-src': ["'self'"],
-      'script-src': [
-          "'self'",
-          "'unsafe-eval'",
-          "'unsafe-inline'",
-          'https://www.gstatic.com',
-      ],
-      'object-src': ["'none'"],
-      'style-src': [
-          "'self'",
-          "'unsafe-inline'",
-          'https://fonts.googleapis.com',
-          'https://www.gstatic.com',
-      ],
-      'font-src': [
-          "'self'",
-          'https://fonts.googleapis.com',
-          'https://fonts.gstatic.com',
-          'data:',
-      ],
-      'connect-src': [
-          "'self'",
-          'data:',
-          'www.gstatic.com',
-      ],
-      'img-src': [
-          "'self'",
-          'blob:',
-          'data:',
-      ],
-      'script-src-elem': [
-          "'self'",
-          "'unsafe-inline'",
-          # Remember to restrict on integrity when importing from jsdelivr
-          # Whitelist this domain to support hlo_graph_dumper html format
-          'https://cdn.jsdelivr.net/npm/',
-          'https://www.gstatic.com',
-      ],
-  }
-  csp = ';'.join((' '.join([k] + v) for (k, v) in csp_parts.items()))
-  headers = [
-      ('Content-Security-Policy', csp),
-      ('X-Content-Type-Options', 'nosniff'),
-  ]
+  headers = _HEADERS_TEMPLATE.copy()
+  if etag:
+    headers['ETag'] = '"%s"' % etag
   if content_encoding:
-    headers.append(('Content-Encoding', content_encoding))
-  else:
-    headers.append(('Content-Encoding', 'gzip'))
-    body = gzip.compress(body)
+    headers['Content-Encoding'] = content_encoding
+  elif len(body) >= _GZIP_MIN_BYTES and content_type not in _NO_COMPRESS_TYPES:
+    headers['Content-Encoding'] = 'gzip'
+    if precompressed is not None:
+      body = precompressed
+    else:
+      body = _gzip_compress(body)
   return wrappers.Response(
       body, content_type=content_type, status=code, headers=headers
   )
 
 
 def _plugin_assets(
-    logdir: str, runs: list[str], plugin_name: str
-) -> dict[str, list[str]]:
-  result = {}
-  for run in runs:
-    run_path = _tb_run_directory(logdir, run)
-    assets = plugin_asset_util.ListAssets(run_path, plugin_name)
-    result[run] = assets
-  return result
+    run_dirs: Iterable[tuple[str, str]],
+    plugin_name: str,
+    pool: Optional[futures.ThreadPoolExecutor] = None,
+) -> Iterator[tuple[str, str, list[str]]]:
+  """Streams (run, run_dir, assets) triples, optionally fanning out to a pool.
+
+  Each per-run listing is an independent, latency-bound operation (a LIST
+  RPC on remote filesystems), so dispatching them concurrently bounds the
+  total wall time by the slowest single listing instead of their sum. The
+  run directories come pre-resolved from the caller — which has already
+  computed them — rather than being re-derived here. Input may be a lazy
+  iterable: listings are dispatched as entries arrive and each result is
+  yielded as soon as its listing completes, so a caller can react to the
+  first run while later listings are in flight.
+
+  Args:
+    run_dirs: Iterable of (run name, TensorBoard run directory) pairs.
+    plugin_name: Name of the plugin whose assets to list.
+    pool: Optional executor used to issue the per-run listings in parallel;
+      when None, the listings are issued serially.
+
+  Yields:
+    (run name, run directory, list of plugin assets) triples, in
+    completion order when a pool is given.
+  """
+
+  def list_assets(run: str, run_path: str) -> tuple[str, str, list[str]]:
+    return run, run_path, plugin_asset_util.ListAssets(run_path, plugin_name)
+
+  if pool is None:
+    for run, run_path in run_dirs:
+      yield list_assets(run, run_path)
+    return
+  pending: set[futures.Future] = set()
+  for run, run_path in run_dirs:
+    pending.add(pool.submit(list_assets, run, run_path))
+    done, pending = futures.wait(pending, timeout=0)
+    for future in done:
+      yield future.result()
+  while pending:
+    done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+    for future in done:
+      yield future.result()
+
+
+def _find_tb_runs_flat(logdir: str) -> Iterator[str]:
+  """Finds TensorBoard run names holding profile data with one listing.
+
+  Object stores answer a recursive find in a few paginated LIST requests,
+  whereas a per-directory walk pays one round trip per directory for the
+  same information. This yields the run name (the path relative to the
+  logdir, or '.' for the root) for every plugins/profile directory found.
+
+  Args:
+    logdir: An object-store logdir URI, e.g. 'gs://bucket/logs'.
+
+  Yields:
+    TensorBoard run names relative to the logdir.
+  """
+  # Resolve the filesystem through fsspec directly: plugin_asset_util may
+  # be bound to TensorBoard's implementation, which has no such helper.
+  fs = fsspec.filesystem(logdir.split('://', 1)[0])
+  # fs.find returns paths without the protocol prefix, so compare against
+  # the logdir with its protocol stripped as well.
+  base = logdir.split('://', 1)[-1].rstrip('/')
+  suffix = '/' + TB_NAME + '/' + PLUGIN_NAME
+  for path in fs.find(logdir, withdirs=True):
+    path = path.rstrip('/')
+    if not path.endswith(suffix):
+      continue
+    relative = path[: -len(suffix)][len(base):].strip('/')
+    yield relative or '.'
+
+
+def _parallel_walk(root: str, num_workers: int = 8) -> Iterator[str]:
+  """Finds plugins/profile directories under a local tree with worker threads.
+
+  os.walk drains one getdents stream at a time, so walking a giant tree
+  (network-mounted filesystems especially) is bound by serialized syscall
+  latency. A few threads pulling directories off a shared queue keep
+  several scandir streams in flight instead. The descent is pruned below
+  plugins/profile directories and skips _SCAN_SKIP_DIR_NAMES.
+
+  Args:
+    root: Local directory to walk.
+    num_workers: Number of scanning threads.
+
+  Yields:
+    Paths of directories ending with the plugins/profile suffix, as the
+    workers find them.
+  """
+  pending: queue.Queue[Optional[str]] = queue.Queue()
+  hits: queue.Queue[Optional[str]] = queue.Queue()
+  pending.put(root)
+  state_lock = threading.Lock()
+  # Directories queued or currently being scanned; the walk is complete
+  # when this reaches zero.
+  outstanding = [1]
+
+  def scan() -> None:
+    while True:
+      current = pending.get()
+      if current is None:
+        return
+      children = []
+      try:
+        with os.scandir(current) as entries:
+          for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+              continue
+            if entry.path.endswith(_PROFILE_DIR_SUFFIX):
+              hits.put(entry.path)
+            elif entry.name not in _SCAN_SKIP_DIR_NAMES:
+              children.append(entry.path)
+      except OSError as e:
+        logger.warning('Could not list directory %s: %s', current, e)
+      with state_lock:
+        outstanding[0] += len(children) - 1
+        done = not outstanding[0]
+      for child in children:
+        pending.put(child)
+      if done:
+        for _ in range(num_workers):
+          pending.put(None)
+        hits.put(None)
+
+  for _ in range(num_workers):
+    threading.Thread(target=scan, daemon=True).start()
+  try:
+    while True:
+      hit = hits.get()
+      if hit is None:
+        return
+      yield hit
+  finally:
+    # A consumer that abandons the walk early (generator closed) must not
+    # leak blocked workers; zero the account and wake them all.
+    with state_lock:
+      outstanding[0] = 0
+    for _ in range(num_workers):
+      pending.put(None)
+
+
+_plugin_directory_cache: dict[tuple[str, str], str] = {}
+
+
+def _plugin_directory(logdir: str, plugin_name: str) -> str:
+  """Memoized front for plugin_asset_util.PluginDirectory.
 
+  The join is pure, but it runs once per run per request. The lookup stays
+  late-bound through the module so tests that patch PluginDirectory still
+  intercept the first call for each key.
 
+  Args:
+    logdir: A TensorBoard run directory path.
+    plugin_name: Name of the plugin whose directory to resolve.
+
+  Returns:
+    The plugin asset directory under the given run directory.
+  """
+  key = (logdir, plugin_name)
+  cached = _plugin_directory_cache.get(key)
+  if cached is None:
+    cached = plugin_asset_util.PluginDirectory(logdir, plugin_name)
+    _plugin_directory_cache[key] = cached
+  return cached
+
+
+@functools.lru_cache(maxsize=1024)
 def _tb_run_directory(logdir: str, run: str) -> str:
   """Returns the TensorBoard run directory for a TensorBoard run name.
 
@@ -395,10 +859,22 @@ def validate_xplane_asset_paths(asset_paths: List[str]) -> None:
   Raises:
     FileNotFoundError: If any of the xplane asset paths do not exist.
   """
-  for asset_path in asset_paths:
-    if str(asset_path).endswith(TOOLS['xplane']) and not epath.Path(
-        asset_path
-    ).exists():
+  xplane_paths = [
+      asset_path
+      for asset_path in asset_paths
+      if str(asset_path).endswith(TOOLS['xplane'])
+  ]
+  if not xplane_paths:
+    return
+  if len(xplane_paths) == 1:
+    exists = [epath.Path(xplane_paths[0]).exists()]
+  else:
+    # Each exists() is a blocking HEAD request on remote filesystems; check
+    # the paths concurrently so the wall time is one round trip, not N.
+    with futures.ThreadPoolExecutor(len(xplane_paths)) as pool:
+      exists = list(pool.map(lambda p: epath.Path(p).exists(), xplane_paths))
+  for asset_path, found in zip(xplane_paths, exists):
+    if not found:
       raise FileNotFoundError(f'Invalid asset path: {asset_path}')
 
 
@@ -423,18 +899,80 @@ class ProfilePlugin(base_plugin.TBPlugin):
     self._is_active = False
     # Lock to ensure at most one thread computes _is_active at a time.
     self._is_active_lock = threading.Lock()
+    # When the last negative is_active computation finished, for the TTL.
+    self._is_active_checked_at = 0.0
     # Cache to map profile run name to corresponding tensorboard dir name
     self._run_to_profile_run_dir = {}
+    # Static frontend assets never change during the process lifetime, so
+    # cache both the raw and gzip-compressed contents after the first read.
+    self._static_cache: dict[str, tuple[bytes, bytes]] = {}
+    # TTL'd cache of run-directory listings, keyed by run_dir.
+    self._dir_listing_cache: dict[str, tuple[float, list[str]]] = {}
+    # TTL'd cache of cache_version.txt contents, keyed by run_dir; None
+    # records that the file does not exist.
+    self._cache_version_cache: dict[str, tuple[float, Optional[str]]] = {}
+    # Shared throttle for storage listing requests, charged per actual call.
+    self._gcs_bucket = _GcsTokenBucket()
+    # Pool for overlapping latency-bound directory scans; sized for remote
+    # filesystems where each listing is dominated by round-trip time.
+    self._scan_pool = futures.ThreadPoolExecutor(
+        max_workers=_SCAN_WORKERS, thread_name_prefix='profile_plugin_scan'
+    )
+    # In-flight /data conversions keyed by request identity, so that
+    # concurrent identical requests share a single computation.
+    self._inflight: dict[tuple, futures.Future] = {}
+    self._inflight_lock = threading.Lock()
+    # Background profile captures; a trace can run for minutes and must
+    # not tie up an HTTP worker thread for its whole duration.
+    self._capture_pool = futures.ThreadPoolExecutor(
+        max_workers=2, thread_name_prefix='profile_plugin_capture'
+    )
+    self._capture_jobs: dict[str, futures.Future] = {}
+    # Completion times of finished capture jobs, so entries whose status
+    # is never polled still get evicted after a TTL.
+    self._capture_done_at: dict[str, float] = {}
+    # Result of the last completed logdir scan: (monotonic completion time,
+    # logdir mtime or None for remote logdirs, ordered frontend run names).
+    self._runs_cache: Optional[tuple[float, Optional[float], list[str]]] = None
+    self._load_persisted_runs()
+    # Tool lists per profile run directory, tagged with the scan epoch at
+    # which they were computed; bumped each time a full scan completes so
+    # freshly written trace files are picked up on the next cycle.
+    self._scan_epoch = 0
+    self._tools_cache: dict[str, tuple[int, list[str]]] = {}
+    # Keeps the runs cache warm so request threads rarely pay for a scan.
+    # A non-positive TTL disables caching entirely, so there is nothing to
+    # keep warm and the loop would degenerate into a continuous rescan.
+    if _RUNS_CACHE_TTL_SECONDS > 0:
+      threading.Thread(
+          target=self._refresh_runs_cache_loop,
+          name='profile_plugin_runs_refresh',
+          daemon=True,
+      ).start()
 
   def is_active(self) -> bool:
     """Whether this plugin is active and has any profile data to show.
 
+    Positive results are cached indefinitely and served without taking the
+    lock. Negative results are cached for _IS_ACTIVE_NEG_TTL_SECONDS so
+    that repeated or concurrent polls of a dormant plugin don't each
+    trigger a full logdir walk.
+
     Returns:
       Whether any run has profile data.
     """
-    if not self._is_active:
+    if self._is_active:
+      return True
+    with self._is_active_lock:
+      if self._is_active:
+        return True
+      now = time.monotonic()
+      if now - self._is_active_checked_at < _IS_ACTIVE_NEG_TTL_SECONDS:
+        return False
+      # any() closes the generator at the first discovered run.
       self._is_active = any(self.generate_runs())
-    return self._is_active
+      self._is_active_checked_at = now
+      return self._is_active
 
   def get_plugin_apps(
       self,
@@ -455,29 +993,34 @@ class ProfilePlugin(base_plugin.TBPlugin):
         DATA_ROUTE: self.data_route,
         HLO_MODULE_LIST_ROUTE: self.hlo_module_list_route,
         CAPTURE_ROUTE: self.capture_route,
+        CAPTURE_STATUS_ROUTE: self.capture_status_route,
         LOCAL_ROUTE: self.default_handler
     }
 
   # pytype: disable=wrong-arg-types
   @wrappers.Request.application
   def default_handler(self, _: wrappers.Request) -> wrappers.Response:
-    contents = self._read_static_file_impl('index.html')
-    return respond(contents, 'text/html')
+    contents, gzipped = self._read_static_file_impl('index.html')
+    return respond(contents, 'text/html', precompressed=gzipped)
 
   def frontend_metadata(self):
     return base_plugin.FrontendMetadata(es_module_path='/index.js')
 
-  def _read_static_file_impl(self, filename: str) -> bytes:
-    """Reads contents from a filename.
+  def _read_static_file_impl(self, filename: str) -> tuple[bytes, bytes]:
+    """Reads contents from a filename, caching raw and gzipped copies.
 
     Args:
       filename (str): Name of the file.
 
     Returns:
-      Contents of the file.
+      A tuple of the contents of the file and a gzip-compressed copy.
     Raises:
       IOError: File could not be read or found.
     """
+    cached = self._static_cache.get(filename)
+    if cached is not None:
+      return cached
+
     filepath = os.path.join(os.path.dirname(__file__), 'static', filename)
 
     try:
@@ -485,7 +1028,11 @@ class ProfilePlugin(base_plugin.TBPlugin):
         contents = infile.read()
     except IOError as io_error:
       raise io_error
-    return contents
+    # Compression happens once per file, so spend the effort on the best
+    # ratio; mtime=0 keeps the output deterministic.
+    gzipped = gzip.compress(contents, compresslevel=9, mtime=0)
+    self._static_cache[filename] = (contents, gzipped)
+    return contents, gzipped
 
   # pytype: disable=wrong-arg-types
   @wrappers.Request.application
@@ -502,10 +1049,10 @@ class ProfilePlugin(base_plugin.TBPlugin):
     else:
       mimetype = 'application/octet-stream'
     try:
-      contents = self._read_static_file_impl(filename)
+      contents, gzipped = self._read_static_file_impl(filename)
     except IOError:
       return respond('Fail to read the files.', 'text/plain', code=404)
-    return respond(contents, mimetype)
+    return respond(contents, mimetype, precompressed=gzipped)
 
   # pytype: disable=wrong-arg-types
   @wrappers.Request.application
@@ -543,21 +1090,53 @@ class ProfilePlugin(base_plugin.TBPlugin):
     """
     return list(self.generate_tools_of_run(run))
 
+  def _list_run_dir(self, run_dir: str) -> list[str]:
+    """Lists the files in a run directory, caching results briefly.
+
+    The listing is done once per TTL window so that handlers hitting the
+    same run directory back-to-back (hosts, module list, data) share a
+    single LIST operation instead of issuing one glob each.
+
+    Args:
+      run_dir: The profile run directory to list.
+
+    Returns:
+      A list of file basenames in the run directory.
+
+    Raises:
+      OSError: If the directory could not be listed.
+    """
+    now = time.time()
+    cached = self._dir_listing_cache.get(run_dir)
+    if cached is not None and now - cached[0] < _DIR_LISTING_TTL_SECONDS:
+      return cached[1]
+    if '://' in run_dir:
+      self._gcs_bucket.acquire(1)
+    # .name is a plain attribute access; basename+fspath would re-parse
+    # and re-allocate each entry's path string twice.
+    filenames = [f.name for f in epath.Path(run_dir).iterdir()]
+    self._dir_listing_cache[run_dir] = (now, filenames)
+    return filenames
+
   def _run_host_impl(
       self, run: str, run_dir: str, tool: str
   ) -> List[HostMetadata]:
     if not run_dir:
       logger.warning('Cannot find asset directory for: %s', run)
       return []
-    tool_pattern = '*.xplane.pb'
+    tool_suffix = '.' + TOOLS['xplane']
     filenames = []
     try:
-      path = epath.Path(run_dir)
-      filenames = path.glob(tool_pattern)
+      filenames = [
+          name for name in self._list_run_dir(run_dir)
+          if name.endswith(tool_suffix)
+      ]
     except OSError as e:
       logger.warning('Cannot read asset directory: %s, OpError %s', run_dir, e)
-    filenames = [os.fspath(os.path.basename(f)) for f in filenames]
 
+    # The nested [{'hostname': ...}] shape is what the frontend consumes.
+    # With orjson serializing the response, the per-host dict construction
+    # is noise even for thousand-host runs, so keep the simple shape.
     return [{'hostname': host} for host in filenames_to_hosts(filenames, tool)]
 
   def host_impl(
@@ -620,6 +1199,74 @@ class ProfilePlugin(base_plugin.TBPlugin):
     module_names_str = self.hlo_module_list_impl(request)
     return respond(module_names_str, 'text/plain')
 
+  def _coalesce(self, key: tuple, compute: Callable[[], Any]) -> Any:
+    """Runs `compute` once per key across concurrent callers.
+
+    The first caller for a key performs the computation; callers arriving
+    while it is still in flight wait on its future and share the result
+    (or the raised exception). The entry is evicted once the computation
+    finishes, so subsequent requests recompute.
+
+    Args:
+      key: Hashable identity of the computation.
+      compute: Zero-argument callable producing the result.
+
+    Returns:
+      The result of `compute` for this key.
+    """
+    with self._inflight_lock:
+      future = self._inflight.get(key)
+      if future is not None:
+        waiting = True
+      else:
+        waiting = False
+        future = futures.Future()
+        self._inflight[key] = future
+    if waiting:
+      return future.result()
+    try:
+      result = compute()
+      future.set_result(result)
+      return result
+    except BaseException as e:
+      future.set_exception(e)
+      raise
+    finally:
+      with self._inflight_lock:
+        self._inflight.pop(key, None)
+
+  def _read_cache_version(self, run_dir: str) -> Optional[str]:
+    """Returns the converter version recorded in a run directory, if any.
+
+    The file is opened directly rather than checked for existence first,
+    which costs one RPC on remote filesystems and leaves no TOCTOU window.
+    Results are cached per run_dir with a short TTL; the write path
+    refreshes the entry directly.
+
+    Args:
+      run_dir: The profile run directory.
+
+    Returns:
+      The recorded version string, or None if no cache version file
+      exists.
+
+    Raises:
+      OSError: If the file exists but could not be read.
+    """
+    now = time.time()
+    cached = self._cache_version_cache.get(run_dir)
+    if cached is not None and now - cached[0] < _CACHE_VERSION_TTL_SECONDS:
+      return cached[1]
+    try:
+      with epath.Path(os.path.join(run_dir, CACHE_VERSION_FILE)).open(
+          'r'
+      ) as f:
+        cache_version = f.read().strip()
+    except FileNotFoundError:
+      cache_version = None
+    self._cache_version_cache[run_dir] = (now, cache_version)
+    return cache_version
+
   def data_impl(
       self, request: wrappers.Request
   ) -> tuple[Optional[str], str, Optional[str]]:
@@ -633,7 +1280,9 @@ class ProfilePlugin(base_plugin.TBPlugin):
         run or host is invalid.
     """
     run = request.args.get('run')
-    tool = request.args.get('tag')
+    # Interning makes the repeated frozenset lookups below compare by
+    # identity; tool names are drawn from a small fixed vocabulary.
+    tool = sys.intern(request.args.get('tag') or '')
     host = request.args.get('host')
     module_name = request.args.get('module_name')
     tqx = request.args.get('tqx')
@@ -644,14 +1293,7 @@ class ProfilePlugin(base_plugin.TBPlugin):
     # Check if the cache file exists and if the version is the same as the
     # current version. If not, set use_saved_result to False.
     try:
-      if epath.Path(os.path.join(run_dir, CACHE_VERSION_FILE)).exists():
-        with epath.Path(os.path.join(run_dir, CACHE_VERSION_FILE)).open(
-            'r'
-        ) as f:
-          cache_version = f.read().strip()
-          if cache_version != version.__version__:
-            use_saved_result = False
-      else:
+      if self._read_cache_version(run_dir) != version.__version__:
         use_saved_result = False
     except OSError as e:
       logger.warning('Cannot read cache version file: %s', e)
@@ -691,23 +1333,39 @@ class ProfilePlugin(base_plugin.TBPlugin):
     _, content_encoding = None, None
     if use_xplane(tool):
       if host == ALL_HOSTS:
-        file_pattern = make_filename('*', 'xplane')
+        file_suffix = '.' + TOOLS['xplane']
         try:
-          path = epath.Path(run_dir)
-          asset_paths = list(path.glob(file_pattern))
+          asset_paths = [
+              os.path.join(run_dir, name)
+              for name in self._list_run_dir(run_dir)
+              if name.endswith(file_suffix)
+          ]
         except OSError as e:
           logger.warning('Cannot read asset directory: %s, OpError %s', run_dir,
                          e)
           raise IOError(
               'Cannot read asset directory: %s, OpError %s' % (run_dir, e)
           ) from e
+        # These paths come straight from the directory listing above, so
+        # re-checking exists() would pay one HEAD request per host on remote
+        # filesystems just to confirm what the listing already proved.
+        paths_preverified = True
       else:
         asset_paths = [asset_path]
+        paths_preverified = False
 
+      def compute():
+        if not paths_preverified:
+          validate_xplane_asset_paths(asset_paths)
+        return convert.xspace_to_tool_data(asset_paths, tool, params)
+
+      # Identical concurrent requests (multiple tabs, reloads) share one
+      # conversion instead of each paying the proto parse.
+      coalesce_key = (
+          run, tool, host, module_name, tuple(sorted(request.args.items()))
+      )
       try:
-        validate_xplane_asset_paths(asset_paths)
-        data, content_type = convert.xspace_to_tool_data(
-            asset_paths, tool, params)
+        data, content_type = self._coalesce(coalesce_key, compute)
       except AttributeError as e:
         logger.warning('Error generating analysis results due to %s', e)
         raise AttributeError(
@@ -727,6 +1385,10 @@ class ProfilePlugin(base_plugin.TBPlugin):
               'w'
           ) as f:
             f.write(version.__version__)
+          self._cache_version_cache[run_dir] = (
+              time.time(),
+              version.__version__,
+          )
         except OSError as e:
           logger.warning('Cannot write cache version file: %s', e)
 
@@ -745,14 +1407,15 @@ class ProfilePlugin(base_plugin.TBPlugin):
     if not run_dir:
       logger.warning('Cannot find asset directory for: %s', run)
       return ''
-    tool_pattern = '*.hlo_proto.pb'
+    tool_suffix = '.' + TOOLS['hlo_proto']
     filenames = []
     try:
-      path = epath.Path(run_dir)
-      filenames = path.glob(tool_pattern)
+      filenames = [
+          name for name in self._list_run_dir(run_dir)
+          if name.endswith(tool_suffix)
+      ]
     except OSError as e:
       logger.warning('Cannot read asset directory: %s, OpError %s', run_dir, e)
-    filenames = [os.fspath(os.path.basename(f)) for f in filenames]
     for filename in filenames:
       module_name, _ = _parse_filename(filename)
       if module_name:
@@ -760,6 +1423,37 @@ class ProfilePlugin(base_plugin.TBPlugin):
     module_names_str = ','.join(module_list)
     return module_names_str
 
+  def _data_etag(self, request: wrappers.Request) -> Optional[str]:
+    """Computes an entity tag for a /data request without converting.
+
+    The tag is derived from the request identity, the converter version and
+    the run-directory listing, all of which are available without parsing
+    any profile data. Profile run directories are immutable once written,
+    so a matching tag means the heavy convert-and-compress pipeline can be
+    skipped with a 304.
+
+    Args:
+      request: XMLHttpRequest.
+
+    Returns:
+      A hex entity tag, or None if the run directory could not be resolved.
+    """
+    run = request.args.get('run')
+    try:
+      run_dir = self._run_dir(run)
+      filenames = sorted(self._list_run_dir(run_dir))
+    except (OSError, RuntimeError):
+      return None
+    key = repr((
+        run,
+        request.args.get('tag'),
+        request.args.get('host'),
+        request.args.get('module_name'),
+        version.__version__,
+        filenames,
+    ))
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
   # pytype: disable=wrong-arg-types
   @wrappers.Request.application
   def data_route(self, request: wrappers.Request) -> wrappers.Response:
@@ -767,10 +1461,22 @@ class ProfilePlugin(base_plugin.TBPlugin):
     # params
     #   request: XMLHTTPRequest.
     try:
+      etag = self._data_etag(request)
+      if etag and etag in request.if_none_match:
+        return respond(b'', 'application/json', code=304, etag=etag)
       data, content_type, content_encoding = self.data_impl(request)
       if data is None:
         return respond('No Data', 'text/plain', code=404)
-      return respond(data, content_type, content_encoding=content_encoding)
+      if (
+          content_encoding is None
+          and isinstance(data, (bytes, str))
+          and len(data) >= _STREAM_MIN_BYTES
+          and content_type not in _NO_COMPRESS_TYPES
+      ):
+        return respond_streaming(data, content_type, etag=etag)
+      return respond(
+          data, content_type, content_encoding=content_encoding, etag=etag
+      )
     # Data fetch error handler
     except TimeoutError as e:
       return respond(str(e), 'text/plain', code=500)
@@ -851,7 +1557,7 @@ class ProfilePlugin(base_plugin.TBPlugin):
       service_addr = master_ip + ':8466'
       # Set the master TPU for streaming trace viewer.
       self.master_tpu_unsecure_channel = master_ip
-    try:
+    def run_trace():
       if options:
         profiler_client.trace(
             service_addr,
@@ -868,22 +1574,101 @@ class ProfilePlugin(base_plugin.TBPlugin):
             worker_list,
             num_tracing_attempts,
         )
+
+    if request.args.get('blocking', 'true') != 'false':
+      # The stock frontend consumes this response synchronously: it shows
+      # result/error in a snackbar and then reloads the run list, so the
+      # capture must have finished by the time we respond.
+      try:
+        run_trace()
+        return respond(
+            {'result': 'Capture profile successfully. Please refresh.'},
+            'application/json',
+        )
+      except tf.errors.UnavailableError:
+        return respond(
+            {'error': 'empty trace result.'},
+            'application/json',
+            code=200,
+        )
+      except Exception as e:  # pylint: disable=broad-except
+        return respond(
+            {'error': str(e)},
+            'application/json',
+            code=500,
+        )
+
+    # With blocking=false the trace runs off the request thread; the
+    # caller gets a job_id and polls /capture_status for the outcome.
+    self._evict_stale_capture_jobs()
+    job_id = uuid.uuid4().hex
+    job = self._capture_pool.submit(run_trace)
+    job.add_done_callback(
+        lambda _: self._capture_done_at.setdefault(job_id, time.monotonic())
+    )
+    self._capture_jobs[job_id] = job
+    return respond(
+        {'result': 'Capture profile started.', 'job_id': job_id},
+        'application/json',
+    )
+
+  def _evict_stale_capture_jobs(self) -> None:
+    """Drops finished capture jobs whose status nobody polled in time."""
+    now = time.monotonic()
+    for job_id, done_at in list(self._capture_done_at.items()):
+      if now - done_at >= _CAPTURE_JOB_TTL_SECONDS:
+        self._capture_done_at.pop(job_id, None)
+        self._capture_jobs.pop(job_id, None)
+
+  # pytype: disable=wrong-arg-types
+  @wrappers.Request.application
+  def capture_status_route(self, request: wrappers.Request) -> wrappers.Response:
+    # pytype: enable=wrong-arg-types
+    return self.capture_status_impl(request)
+
+  def capture_status_impl(self, request: wrappers.Request) -> wrappers.Response:
+    """Reports the state of a background capture job.
+
+    Args:
+      request: werkzeug request with a 'job_id' arg as returned by
+        capture_route_impl when called with blocking=false.
+
+    Returns:
+      A JSON response with a 'state' of 'running' or 'done', plus the
+      result or error message once done. Finished jobs are forgotten after
+      their first status report.
+    """
+    self._evict_stale_capture_jobs()
+    job_id = request.args.get('job_id')
+    job = self._capture_jobs.get(job_id)
+    if job is None:
       return respond(
-          {'result': 'Capture profile successfully. Please refresh.'},
-          'application/json',
+          {'error': 'Unknown capture job id.'}, 'application/json', code=404
       )
-    except tf.errors.UnavailableError:
+    if not job.done():
+      return respond({'state': 'running'}, 'application/json')
+    self._capture_jobs.pop(job_id, None)
+    self._capture_done_at.pop(job_id, None)
+    error = job.exception()
+    if error is None:
       return respond(
-          {'error': 'empty trace result.'},
+          {
+              'state': 'done',
+              'result': 'Capture profile successfully. Please refresh.',
+          },
           'application/json',
-          code=200,
       )
-    except Exception as e:  # pylint: disable=broad-except
+    if tf and isinstance(error, tf.errors.UnavailableError):
       return respond(
-          {'error': str(e)},
+          {'state': 'done', 'error': 'empty trace result.'},
           'application/json',
-          code=500,
+          code=200,
       )
+    return respond(
+        {'state': 'done', 'error': str(error)},
+        'application/json',
+        code=500,
+    )
 
   def _get_graph_viewer_options(
       self, request: wrappers.Request
@@ -925,6 +1710,12 @@ class ProfilePlugin(base_plugin.TBPlugin):
       RuntimeError: If the run directory is not found.
     """
     run = run.rstrip(os.sep)
+    # The scan that discovered this run already verified its directory;
+    # serving the remembered path avoids re-stat'ing the tb run directory
+    # (a round trip per request on remote filesystems).
+    profile_run_dir = self._run_to_profile_run_dir.get(run)
+    if profile_run_dir is not None:
+      return profile_run_dir
     tb_run_name, profile_run_name = os.path.split(run)
     if not tb_run_name:
       tb_run_name = '.'
@@ -932,13 +1723,90 @@ class ProfilePlugin(base_plugin.TBPlugin):
     if not epath.Path(tb_run_directory).is_dir():
       raise RuntimeError('No matching run directory for run %s' % run)
 
-    plugin_directory = plugin_asset_util.PluginDirectory(
-        tb_run_directory, PLUGIN_NAME)
+    plugin_directory = _plugin_directory(tb_run_directory, PLUGIN_NAME)
     return os.path.join(plugin_directory, profile_run_name)
 
+  def _runs_cache_path(self) -> str:
+    digest = hashlib.sha1(self.logdir.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(
+        os.path.expanduser('~'), '.cache', 'xprof', digest + '.json'
+    )
+
+  def _load_persisted_runs(self) -> None:
+    """Seeds the runs cache from disk so a restart skips the cold walk."""
+    if os.environ.get(_CACHE_RUNS_ENV) != '1':
+      return
+    try:
+      with open(self._runs_cache_path(), encoding='utf-8') as f:
+        payload = json.load(f)
+    except (OSError, ValueError):
+      return
+    # The recorded generation must match the logdir's current mtime;
+    # remote logdirs record None and rely on the TTL alone.
+    if payload.get('generation') != self._logdir_mtime():
+      return
+    runs = payload.get('runs')
+    run_dirs = payload.get('run_dirs')
+    if not isinstance(runs, list) or not isinstance(run_dirs, dict):
+      return
+    self._run_to_profile_run_dir.update(run_dirs)
+    self._runs_cache = (time.monotonic(), payload.get('generation'), runs)
+
+  def _persist_runs(
+      self, logdir_mtime: Optional[float], runs: list[str]
+  ) -> None:
+    """Writes the completed scan to the on-disk cache, atomically."""
+    if os.environ.get(_CACHE_RUNS_ENV) != '1':
+      return
+    cache_path = self._runs_cache_path()
+    tmp_path = '%s.%d.tmp' % (cache_path, os.getpid())
+    # Snapshot the run-dir map: other request threads keep mutating it, and
+    # serializing the live dict can raise mid-iteration.
+    run_dirs = dict(self._run_to_profile_run_dir)
+    try:
+      os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+      with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(
+            {
+                'generation': logdir_mtime,
+                'runs': runs,
+                'run_dirs': run_dirs,
+            },
+            f,
+        )
+      os.replace(tmp_path, cache_path)
+    except Exception as e:  # pylint: disable=broad-except
+      # The cache is best-effort; never let a persistence failure surface as
+      # an error on the request that happened to finish the scan.
+      logger.warning('Could not persist runs cache: %s', e)
+
+  def _logdir_mtime(self) -> Optional[float]:
+    """Returns the logdir mtime for local paths, or None for remote ones."""
+    if '://' in self.logdir:
+      return None
+    try:
+      return os.stat(self.logdir).st_mtime
+    except OSError:
+      return None
+
+  def _refresh_runs_cache_loop(self) -> None:
+    """Periodically rescans the logdir so requests hit a warm runs cache."""
+    while True:
+      time.sleep(_RUNS_CACHE_TTL_SECONDS)
+      try:
+        for _ in self.generate_runs():
+          pass
+      except Exception as e:  # pylint: disable=broad-except
+        logger.warning('Background runs refresh failed: %s', e)
+
   def generate_runs(self) -> Iterator[str]:
     """Generator for a list of runs.
 
+    Completed scans are cached for _RUNS_CACHE_TTL_SECONDS (and, for local
+    logdirs, only while the logdir mtime is unchanged), so the many callers
+    per page load share one traversal instead of each re-walking the
+    logdir.
+
     The "run name" here is a "frontend run name" - see _run_dir() for the
     definition of a "frontend run name" and how it maps to a directory of
     profile data for a specific profile "run". The profile plugin concept of
@@ -987,30 +1855,70 @@ class ProfilePlugin(base_plugin.TBPlugin):
         "run1", "train/run1", "train/run2", "validation/run1",
         "new_job/tensorboard/run1"
     """
+    cached = self._runs_cache
+    if cached is not None:
+      scanned_at, logdir_mtime, runs = cached
+      if (
+          time.monotonic() - scanned_at < _RUNS_CACHE_TTL_SECONDS
+          and logdir_mtime == self._logdir_mtime()
+      ):
+        yield from runs
+        return
+    logdir_mtime = self._logdir_mtime()
+    runs = []
+    for run in self._scan_runs():
+      runs.append(run)
+      yield run
+    # Publish only after the scan ran to completion; a generator abandoned
+    # partway (e.g. is_active short-circuiting on the first run) must not
+    # install a partial run list.
+    self._runs_cache = (time.monotonic(), logdir_mtime, runs)
+    self._scan_epoch += 1
+    self._persist_runs(logdir_mtime, runs)
+
+  def _scan_runs(self) -> Iterator[str]:
+    """Walks the logdir and yields frontend run names; see generate_runs."""
 
     # TODO(kcai): Remove this block once we can rely on walk() to get all
     #             subdirectories, this requires python 3.12.
-    def find_all_subdirectories(top_path: epath.Path) -> Iterator[epath.Path]:
-      @sleep_and_retry
-      @limits(
-          calls=MAX_GCS_REQUESTS / AVERAGE_SUBDIR_NUMBER,
-          period=LIMIT_WINDOW_SECONDS,
-      )
-      def get_subdirectories(
-          current_dir: epath.Path, dirs_to_visit: collections.deque[epath.Path]
-      ):
+    def find_all_subdirectories(top_path: str) -> Iterator[str]:
+      # The frontier holds plain strings: wrapping every node in an
+      # epath.Path re-parses the URI and allocates on each property
+      # access, and only the listing call itself needs the Path API.
+      def get_subdirectories(current_dir: str) -> list[str]:
+        # A plugins/profile directory only holds run payloads below it,
+        # never nested tb runs; the caller has already seen the directory
+        # itself, so stop the descent here.
+        if current_dir.endswith(_PROFILE_DIR_SUFFIX):
+          return []
+        # Only remote listings count against the storage quota; taking the
+        # bucket lock for local scans would just tax every directory.
+        if '://' in current_dir:
+          self._gcs_bucket.acquire(1)
         try:
-          for path in current_dir.iterdir():
-            if path.is_dir():
-              dirs_to_visit.append(path)
+          if '://' not in current_dir:
+            # DirEntry.is_dir() answers from the readdir results, so a
+            # local directory costs one syscall rather than a stat per
+            # entry.
+            with os.scandir(current_dir) as entries:
+              return [
+                  entry.path
+                  for entry in entries
+                  if entry.is_dir(follow_symlinks=False)
+                  and entry.name not in _SCAN_SKIP_DIR_NAMES
+              ]
+          return [
+              os.fspath(path)
+              for path in epath.Path(current_dir).iterdir()
+              if path.name not in _SCAN_SKIP_DIR_NAMES and path.is_dir()
+          ]
         except (IOError, OSError) as e:
           logger.warning('Could not list directory %s: %s', current_dir, e)
+          return []
 
-      if not top_path.is_dir():
+      if not epath.Path(top_path).is_dir():
         return
 
-      dirs_to_visit = collections.deque([top_path])
-
       logger.info(
           'Start to find all subdirectories of %s at %s, subjected to be'
           ' throttled by %d requests per %d seconds',
@@ -1019,84 +1927,126 @@ class ProfilePlugin(base_plugin.TBPlugin):
           MAX_GCS_REQUESTS,
           LIMIT_WINDOW_SECONDS,
       )
-      while dirs_to_visit:
-        current_dir = dirs_to_visit.popleft()
-        yield current_dir
-        get_subdirectories(current_dir, dirs_to_visit)
+      # Level-synchronous BFS: every directory on the current level is
+      # listed in parallel, so a level costs one filesystem round trip of
+      # wall time instead of one per directory. The token bucket still
+      # meters the aggregate request rate across the pool's workers.
+      level = [top_path]
+      while level:
+        yield from level
+        next_level: list[str] = []
+        for subdirectories in self._scan_pool.map(get_subdirectories, level):
+          next_level.extend(subdirectories)
+        level = next_level
       logger.info(
           'Finish finding all subdirectories of %s at %s',
           top_path,
           time.strftime('%Y-%m-%d %H:%M:%S', time.localtime()),
       )
 
-    ctx = tb_context.RequestContext()
-    tb_runs = set()
-    # Get all tfevents files that TensorBoard would consider runs.
-    # TODO(kcai): Remove this block once we can rely on the behavior of
-    #             list_runs() returning all subdirectories with tfevents files.
-    for run in self.data_provider.list_runs(ctx, experiment_id=''):
-      # Ensure that we also check the parent directory of runs generated by
-      # Tensorboard.
-      # Example:
-      # logs/
-      #   2024-08-20-12-34-56/
-      #     plugins/profile/run1/hostA.trace
-      #     train/events.out.tfevents.foo
-      #     validation/events.out.tfevents.foo
-      # list_runs() will return:
-      #   2024-08-20-12-34-56/train
-      #   2024-08-20-12-34-56/validation
-      # and we want to ensure that we also check the parent directory:
-      #   2024-08-20-12-34-56/
-      if os.path.basename(run.run_name) in ['train', 'validation']:
-        tb_runs.add(os.path.dirname(run.run_name))
-    # Ensure that we also check the root logdir and all subdirectories, even if
-    # it isn't a recognized TensorBoard run (i.e. has no tfevents file directly
-    # under it), to remain backwards compatible with previously profile plugin
-    # behavior. Note that we check if logdir is a directory to handle case where
-    # it's actually a multipart directory spec, which this plugin does not
-    # support.
-    #
-    # This change still enforce the requirement that the subdirectories must
-    # end with plugins/profile directory, as enforced by TensorBoard.
-    logdir_path = epath.Path(self.logdir)
-    if '.' not in tb_runs:
-      tb_runs.add('.')
-    if logdir_path.is_dir():
-      for path in find_all_subdirectories(logdir_path):
-        relative_path = path.relative_to(logdir_path)
+    def generate_tb_run_names() -> Iterator[str]:
+      """Yields candidate tb run names as discovery finds them."""
+      # Always check the root logdir, even if it isn't a recognized
+      # TensorBoard run (i.e. has no tfevents file directly under it), to
+      # remain backwards compatible with previous profile plugin behavior.
+      yield '.'
+      ctx = tb_context.RequestContext()
+      # Get all tfevents files that TensorBoard would consider runs.
+      # TODO(kcai): Remove this block once we can rely on the behavior of
+      #             list_runs() returning all subdirectories with tfevents
+      #             files.
+      basename = os.path.basename
+      for run in self.data_provider.list_runs(ctx, experiment_id=''):
+        # Ensure that we also check the parent directory of runs generated by
+        # Tensorboard.
+        # Example:
+        # logs/
+        #   2024-08-20-12-34-56/
+        #     plugins/profile/run1/hostA.trace
+        #     train/events.out.tfevents.foo
+        #     validation/events.out.tfevents.foo
+        # list_runs() will return:
+        #   2024-08-20-12-34-56/train
+        #   2024-08-20-12-34-56/validation
+        # and we want to ensure that we also check the parent directory:
+        #   2024-08-20-12-34-56/
+        if basename(run.run_name) in _TB_SUBDIR_NAMES:
+          yield os.path.dirname(run.run_name)
+      # Also check all subdirectories ending with a plugins/profile
+      # directory, as enforced by TensorBoard. Note that we check if logdir
+      # is a directory to handle case where it's actually a multipart
+      # directory spec, which this plugin does not support.
+      if self.logdir.startswith(_OBJECT_STORE_PREFIXES):
+        # One recursive listing resolves the whole tree; the BFS below
+        # would pay a round trip per directory for the same information.
+        self._gcs_bucket.acquire(1)
         try:
-          *parts, second_last_dir, last_dir = relative_path.parts
-          # Only add subdirectories to runs that are end with plugins/profile.
-          if (
-              len(parts) >= 1  # len(parts) == 0 is the root logdir.
-              and last_dir == PLUGIN_NAME
-              and second_last_dir == TB_NAME
-          ):
-            tb_runs.add(str(epath.Path(*parts)))
-        except ValueError:
-          logger.info('Could not unpack relative path parts: %s', relative_path)
-          pass
-    tb_run_names_to_dirs = {
-        run: _tb_run_directory(self.logdir, run) for run in tb_runs
-    }
-    plugin_assets = _plugin_assets(
-        self.logdir, list(tb_run_names_to_dirs), PLUGIN_NAME
-    )
-    visited_runs = set()
-    for tb_run_name, profile_runs in six.iteritems(plugin_assets):
-      tb_run_dir = tb_run_names_to_dirs[tb_run_name]
-      tb_plugin_dir = plugin_asset_util.PluginDirectory(tb_run_dir, PLUGIN_NAME)
-
+          yield from _find_tb_runs_flat(self.logdir)
+        except (IOError, OSError) as e:
+          logger.warning('Could not list %s: %s', self.logdir, e)
+      elif '://' not in self.logdir:
+        # Keep several scandir streams in flight instead of os.walk's
+        # single serialized one; the win grows with tree size and with
+        # per-syscall latency on network-mounted filesystems.
+        for profile_dir in _parallel_walk(self.logdir):
+          # The root logdir's own plugin directory is covered by the '.'
+          # run; everything deeper maps to its tb run prefix.
+          relative = os.path.relpath(
+              profile_dir[: -len(_PROFILE_DIR_SUFFIX)], self.logdir
+          )
+          if relative != '.':
+            yield relative
+      else:
+        top = self.logdir.rstrip('/')
+        for path in find_all_subdirectories(top):
+          relative_path = path[len(top) + 1:]
+          # Only add subdirectories to runs that end with plugins/profile.
+          # The root logdir's own plugin directory has no separator before
+          # the suffix and so never matches; the '.' run covers it.
+          if relative_path.endswith(_PROFILE_DIR_SUFFIX):
+            yield relative_path[: -len(_PROFILE_DIR_SUFFIX)]
+
+    # Single streaming pass: discovery feeds _plugin_assets lazily, which
+    # dispatches each tb run's listing as the name arrives and hands back
+    # (run, assets) pairs in completion order. A caller that only wants to
+    # know whether any run exists (is_active) can close the generator
+    # after the first yield instead of waiting for the full sweep.
+    seen_tb_runs = set()
+    visited_runs = _VisitedRuns()
+
+    def deduped_tb_run_dirs() -> Iterator[tuple[str, str]]:
+      for tb_run_name in generate_tb_run_names():
+        if tb_run_name not in seen_tb_runs:
+          seen_tb_runs.add(tb_run_name)
+          yield tb_run_name, _tb_run_directory(self.logdir, tb_run_name)
+
+    for tb_run_name, tb_run_dir, profile_runs in _plugin_assets(
+        deduped_tb_run_dirs(), PLUGIN_NAME, self._scan_pool
+    ):
+      tb_plugin_dir = _plugin_directory(tb_run_dir, PLUGIN_NAME)
+      candidates = []
+      sep = os.sep
       for profile_run in profile_runs:
         # Remove trailing separator; some filesystem implementations emit this.
-        profile_run = profile_run.rstrip(os.sep)
+        profile_run = profile_run.rstrip(sep)
+        # Both sides are already normalized, so a plain f-string join
+        # skips os.path.join's variadic separator handling in this
+        # per-profile-run loop.
         if tb_run_name == '.':
           frontend_run = profile_run
         else:
-          frontend_run = os.path.join(tb_run_name, profile_run)
-        profile_run_dir = os.path.join(tb_plugin_dir, profile_run)
-        if epath.Path(profile_run_dir).is_dir():
+          frontend_run = f'{tb_run_name}{sep}{profile_run}'
+        profile_run_dir = f'{tb_plugin_dir}{sep}{profile_run}'
+        candidates.append((frontend_run, profile_run_dir))
+      # Validate this run's directories concurrently while later listings
+      # are still in flight.
+      is_dir_results = self._scan_pool.map(
+          lambda candidate: epath.Path(candidate[1]).is_dir(), candidates
+      )
+      for (frontend_run, profile_run_dir), is_dir in zip(
+          candidates, is_dir_results
+      ):
+        if is_dir:
           self._run_to_profile_run_dir[frontend_run] = profile_run_dir
           if frontend_run not in visited_runs:
             visited_runs.add(frontend_run)
@@ -1105,35 +2055,51 @@ class ProfilePlugin(base_plugin.TBPlugin):
   def generate_tools_of_run(self, run: str) -> Iterator[str]:
     """Generate a list of tools given a certain run."""
     profile_run_dir = self._run_to_profile_run_dir[run]
+    epoch = self._scan_epoch
+    cached = self._tools_cache.get(profile_run_dir)
+    if cached is not None and cached[0] == epoch:
+      yield from cached[1]
+      return
+    tools = []
     if epath.Path(profile_run_dir).is_dir():
       try:
-        filenames = epath.Path(profile_run_dir).iterdir()
+        if '://' not in profile_run_dir:
+          # scandir hands back names straight from the readdir buffer:
+          # no per-entry stat and no Path object per file.
+          with os.scandir(profile_run_dir) as entries:
+            tools = self._get_active_tools(
+                (entry.name for entry in entries), profile_run_dir
+            )
+        else:
+          # The listing is consumed lazily; nothing materializes the
+          # full filename list for run dirs with many host files.
+          tools = self._get_active_tools(
+              (path.name for path in epath.Path(profile_run_dir).iterdir()),
+              profile_run_dir,
+          )
       except OSError as e:
         logger.warning('Cannot read asset directory: %s, NotFoundError %s',
                        profile_run_dir, e)
-        filenames = []
-      if filenames:
-        for tool in self._get_active_tools(
-            [name.name for name in filenames], profile_run_dir
-        ):
-          yield tool
+    # A run's profile files are effectively immutable once written, so the
+    # tool list only needs recomputing after a newer scan completes.
+    self._tools_cache[profile_run_dir] = (epoch, tools)
+    yield from tools
 
   def _get_active_tools(self, filenames, profile_run_dir=''):
     """Get a list of tools available given the filenames created by profiler.
 
     Args:
-      filenames: List of strings that represent filenames
+      filenames: Iterable of strings that represent filenames
       profile_run_dir: The run directory of the profile.
 
     Returns:
       A list of strings representing the available tools
     """
-    tools = _get_tools(filenames, profile_run_dir)
+    del profile_run_dir  # No longer needed to enumerate tool names.
+    tools = _get_tools(filenames)
     if 'trace_viewer@' in tools:
       # streaming trace viewer always override normal trace viewer.
       # the trailing '@' is to inform tf-profile-dashboard.html and
       # tf-trace-viewer.html that stream trace viewer should be used.
       tools.discard('trace_viewer')
-    # Return sorted list of tools with 'overview_page' at the front.
-    op = frozenset(['overview_page'])
-    return list(tools.intersection(op)) + sorted(tools.difference(op))
+    return sorted(tools, key=_tool_sort_key)
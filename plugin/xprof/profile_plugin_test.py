@@ -22,14 +22,18 @@ from __future__ import division
 from __future__ import print_function
 
 import atexit
+import gzip
 import inspect
+import json
 import logging
 import os
 import shutil
 import tempfile
+import threading
 from unittest import mock
 
 from absl.testing import absltest
+from werkzeug import test as werkzeug_test
 
 from xprof import profile_plugin
 from xprof import profile_plugin_test_utils as utils
@@ -350,6 +354,9 @@ class ProfilePluginTest(absltest.TestCase):
     # Overwrite the cache_version.txt file with an old version.
     with open(cache_version_file_path, 'w') as f:
       f.write('1.0.0')
+    # The version is cached per run dir; drop the entry so the external
+    # overwrite is observed immediately.
+    self.plugin._cache_version_cache.pop(run_dir, None)
     _, _, _ = self.plugin.data_impl(
         utils.make_data_request(run='abc', tool='overview_page', host='host1')
     )
@@ -357,6 +364,57 @@ class ProfilePluginTest(absltest.TestCase):
     with open(cache_version_file_path, 'r') as f:
       self.assertEqual(f.read(), version.__version__)
 
+  def testDataRouteReturns304ForMatchingEtag(self):
+    generate_testdata(self.logdir)
+    self.multiplexer.Reload()
+    request = utils.make_data_request(
+        run='bar', tool='unsupported', host='host1')
+    etag = self.plugin._data_etag(request)
+    self.assertIsNotNone(etag)
+    client = werkzeug_test.Client(self.plugin.data_route)
+    with mock.patch.object(self.plugin, 'data_impl') as mock_data_impl:
+      response = client.get(
+          '/data?run=bar&tag=unsupported&host=host1',
+          headers={'If-None-Match': '"%s"' % etag},
+      )
+    self.assertEqual(response.status_code, 304)
+    mock_data_impl.assert_not_called()
+
+  def testDataRouteConvertsOnStaleEtag(self):
+    generate_testdata(self.logdir)
+    self.multiplexer.Reload()
+    client = werkzeug_test.Client(self.plugin.data_route)
+    response = client.get(
+        '/data?run=bar&tag=unsupported&host=host1',
+        headers={'If-None-Match': '"stale"'},
+    )
+    self.assertNotEqual(response.status_code, 304)
+
+  def testDataEtagTracksRunDirAndConverterVersion(self):
+    generate_testdata(self.logdir)
+    self.multiplexer.Reload()
+    request = utils.make_data_request(run='abc', tool='xplane', host='host1')
+    original = self.plugin._data_etag(request)
+    self.assertIsNotNone(original)
+    # A new file in the run directory must change the tag.
+    run_dir = os.path.join(
+        plugin_asset_util.PluginDirectory(
+            self.logdir, profile_plugin.ProfilePlugin.plugin_name),
+        'abc')
+    new_file = os.path.join(
+        run_dir, profile_plugin.make_filename('host3', 'xplane'))
+    with open(new_file, 'wb') as f:
+      f.write(b'xplane')
+    # Listings are cached per run dir with a short TTL; drop the entry so
+    # the new file is observed immediately.
+    self.plugin._dir_listing_cache.pop(run_dir, None)
+    after_write = self.plugin._data_etag(request)
+    self.assertNotEqual(original, after_write)
+    # A converter version bump must change the tag as well.
+    with mock.patch.object(version, '__version__', 'test-version'):
+      after_version_bump = self.plugin._data_etag(request)
+    self.assertNotEqual(after_write, after_version_bump)
+
   def testActive(self):
 
     def wait_for_thread():
@@ -371,6 +429,9 @@ class ProfilePluginTest(absltest.TestCase):
     wait_for_thread()
     generate_testdata(self.logdir)
     self.multiplexer.Reload()
+    # Negative results are cached, so expire the TTL to force a rescan.
+    self.plugin._is_active_checked_at -= (
+        profile_plugin._IS_ACTIVE_NEG_TTL_SECONDS)
     # Launch a new thread to check if active.
     self.plugin.is_active()
     wait_for_thread()
@@ -394,6 +455,9 @@ class ProfilePluginTest(absltest.TestCase):
     write_empty_event_file(subdir_a)
     self.multiplexer.AddRunsFromDirectory(self.logdir)
     self.multiplexer.Reload()
+    # Negative results are cached, so expire the TTL to force a rescan.
+    self.plugin._is_active_checked_at -= (
+        profile_plugin._IS_ACTIVE_NEG_TTL_SECONDS)
     # Launch a new thread to check if active.
     self.plugin.is_active()
     wait_for_thread()
@@ -401,5 +465,105 @@ class ProfilePluginTest(absltest.TestCase):
     self.assertTrue(self.plugin.is_active())
 
 
+class _FakeUnavailableError(Exception):
+  pass
+
+
+class CaptureRouteTest(absltest.TestCase):
+
+  def setUp(self):
+    super(CaptureRouteTest, self).setUp()
+    logdir = tempfile.mkdtemp(prefix='capture_route_test')
+    self.addCleanup(shutil.rmtree, logdir, ignore_errors=True)
+    self.plugin = utils.create_profile_plugin(logdir)
+    # The capture routes are guarded on tensorflow being importable; stand
+    # in for it so the tests run without a tensorflow install.
+    fake_tf = mock.MagicMock()
+    fake_tf.errors.UnavailableError = _FakeUnavailableError
+    fake_profiler_client = mock.MagicMock()
+    self.trace = fake_profiler_client.trace
+    for name, value in (
+        ('tf', fake_tf),
+        ('profiler', mock.MagicMock()),
+        ('profiler_client', fake_profiler_client),
+    ):
+      patcher = mock.patch.object(profile_plugin, name, value)
+      patcher.start()
+      self.addCleanup(patcher.stop)
+
+  def _capture(self, **args):
+    return self.plugin.capture_route_impl(utils.make_capture_request(**args))
+
+  def _status(self, job_id):
+    return self.plugin.capture_status_impl(
+        utils.make_capture_request(job_id=job_id))
+
+  def testNonBlockingCapturePollsThroughRunningToDone(self):
+    release = threading.Event()
+    self.trace.side_effect = lambda *args, **kwargs: release.wait(10)
+    response = self._capture(service_addr='localhost:8466', blocking='false')
+    self.assertEqual(response.status_code, 200)
+    body = json.loads(response.get_data())
+    self.assertEqual(body['result'], 'Capture profile started.')
+    job_id = body['job_id']
+    status = json.loads(self._status(job_id).get_data())
+    self.assertEqual(status['state'], 'running')
+    release.set()
+    self.plugin._capture_jobs[job_id].result(timeout=10)
+    status = json.loads(self._status(job_id).get_data())
+    self.assertEqual(status['state'], 'done')
+    self.assertIn('result', status)
+    # A finished job is forgotten after its first status report.
+    self.assertEqual(self._status(job_id).status_code, 404)
+
+  def testNonBlockingCaptureReportsError(self):
+    self.trace.side_effect = RuntimeError('boom')
+    response = self._capture(service_addr='localhost:8466', blocking='false')
+    job_id = json.loads(response.get_data())['job_id']
+    self.assertIsNotNone(
+        self.plugin._capture_jobs[job_id].exception(timeout=10))
+    status_response = self._status(job_id)
+    self.assertEqual(status_response.status_code, 500)
+    status = json.loads(status_response.get_data())
+    self.assertEqual(status['state'], 'done')
+    self.assertEqual(status['error'], 'boom')
+
+  def testCaptureStatusUnknownJobId(self):
+    response = self._status('no-such-job')
+    self.assertEqual(response.status_code, 404)
+    self.assertIn('error', json.loads(response.get_data()))
+
+
+class RespondTest(absltest.TestCase):
+
+  def testCompressesLargeTextBody(self):
+    body = 'x' * (profile_plugin._GZIP_MIN_BYTES * 2)
+    response = profile_plugin.respond(body, 'text/plain')
+    self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+    self.assertEqual(gzip.decompress(response.get_data()),
+                     body.encode('utf-8'))
+
+  def testSkipsCompressionForTinyBody(self):
+    response = profile_plugin.respond('No Data', 'text/plain', code=404)
+    self.assertIsNone(response.headers.get('Content-Encoding'))
+    self.assertEqual(response.get_data(), b'No Data')
+
+  def testStreamingRoundTrips(self):
+    body = b'y' * (profile_plugin._STREAM_CHUNK_BYTES * 3 + 17)
+    response = profile_plugin.respond_streaming(body, 'application/json')
+    self.assertEqual(response.headers.get('Content-Encoding'), 'gzip')
+    self.assertEqual(gzip.decompress(response.get_data()), body)
+
+  def testSetsEtagHeader(self):
+    response = profile_plugin.respond('No Data', 'text/plain', etag='abc123')
+    self.assertEqual(response.headers.get('ETag'), '"abc123"')
+
+  def testSkipsCompressionForCompressedContentType(self):
+    body = b'\x00' * (profile_plugin._GZIP_MIN_BYTES * 2)
+    response = profile_plugin.respond(body, 'application/octet-stream')
+    self.assertIsNone(response.headers.get('Content-Encoding'))
+    self.assertEqual(response.get_data(), body)
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -58,6 +58,22 @@ def create_profile_plugin(logdir,
   return profile_plugin.ProfilePlugin(context)
 
 
+def make_capture_request(**args):
+  """Creates a werkzeug.Request for the capture profile routes.
+
+  Args:
+    **args: Query parameters for the request, e.g. service_addr, blocking
+      or job_id.
+
+  Returns:
+    A werkzeug.Request to pass to ProfilePlugin.capture_route_impl or
+    ProfilePlugin.capture_status_impl.
+  """
+  req = Request({})
+  req.args = {key: str(value) for key, value in args.items()}
+  return req
+
+
 def make_data_request(run, tool, host=None, use_saved_result=None):
   """Creates a werkzeug.Request to pass as argument to ProfilePlugin.data_impl.
 